@@ -0,0 +1,35 @@
+"""add payload_version to batches
+
+Revision ID: 2e7b5c9d0a41
+Revises: 9f27d3b6e1c4
+Create Date: 2026-10-15 14:21:48.106372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2e7b5c9d0a41'
+down_revision: Union[str, Sequence[str], None] = '9f27d3b6e1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    'address_validation_batches',
+    'address_recognition_batches',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows stay NULL and are re-validated when processed.
+    for table in TABLES:
+        op.add_column(table, sa.Column('payload_version', sa.SmallInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'payload_version')
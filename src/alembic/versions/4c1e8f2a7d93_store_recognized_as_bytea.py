@@ -0,0 +1,42 @@
+"""store address_recognition_items.recognized as bytea
+
+Revision ID: 4c1e8f2a7d93
+Revises: a96cd8ab3b0c
+Create Date: 2026-10-15 10:12:41.208377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e8f2a7d93'
+down_revision: Union[str, Sequence[str], None] = 'a96cd8ab3b0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'address_recognition_items',
+        'recognized',
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=sa.LargeBinary(),
+        existing_nullable=False,
+        postgresql_using="convert_to(recognized::text, 'UTF8')",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'address_recognition_items',
+        'recognized',
+        existing_type=sa.LargeBinary(),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=False,
+        postgresql_using="convert_from(recognized, 'UTF8')::jsonb",
+    )
@@ -0,0 +1,49 @@
+"""generate primary key uuids server-side
+
+Revision ID: 9f27d3b6e1c4
+Revises: 4c1e8f2a7d93
+Create Date: 2026-10-15 11:03:17.552904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9f27d3b6e1c4'
+down_revision: Union[str, Sequence[str], None] = '4c1e8f2a7d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    'address_validation_batches',
+    'address_validation_items',
+    'address_recognition_batches',
+    'address_recognition_items',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # gen_random_uuid() is built in since PostgreSQL 13; no pgcrypto needed.
+    for table in TABLES:
+        op.alter_column(
+            table,
+            'id',
+            existing_type=sa.UUID(),
+            server_default=sa.text('gen_random_uuid()'),
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.alter_column(
+            table,
+            'id',
+            existing_type=sa.UUID(),
+            server_default=None,
+            existing_nullable=False,
+        )
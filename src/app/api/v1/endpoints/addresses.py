@@ -1,10 +1,19 @@
+import asyncio
 import uuid
+from collections.abc import AsyncGenerator, AsyncIterator, Iterable
+from typing import Any
 
+from arq.connections import ArqRedis
+from arq.constants import job_key_prefix
+from arq.jobs import serialize_job
+from arq.utils import timestamp_ms
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
+from app.core.config import settings
 from app.core.db.database import get_db
 from app.schemas.addresses import (
     AddressRecognizeIn,
@@ -15,13 +24,64 @@ from app.schemas.addresses import (
     AddressValidationResultOut,
     ValidationBatchOut,
     BatchStatus,
-)
-from app.models.address_recognition import (
-    AddressRecognitionBatch,
-    AddressRecognitionItem,
+    RECOGNITION_RESULTS_ADAPTER,
+    VALIDATION_RESULTS_ADAPTER,
 )
 from app.services.address_recognition import AddressRecognitionService
 from app.services.address_validation import AddressValidationService
+from app.workers import streams
+
+
+async def _enqueue_many(redis: ArqRedis, name: str, ids: Iterable[uuid.UUID]) -> None:
+    # Same keys ArqRedis.enqueue_job writes (job key + queue zset), but every
+    # job goes out in one non-transactional pipeline. Job ids are random, so
+    # the WATCH/EXISTS dedup round-trip of enqueue_job isn't needed.
+    enqueue_time_ms = timestamp_ms()
+    async with redis.pipeline(transaction=False) as pipe:
+        for i in ids:
+            if settings.queue_mode == "streams":
+                streams.add_job(pipe, name, str(i))
+                continue
+
+            job_id = uuid.uuid4().hex
+            job = serialize_job(
+                name,
+                (str(i),),
+                {},
+                None,
+                enqueue_time_ms,
+                serializer=redis.job_serializer,
+            )
+            pipe.psetex(job_key_prefix + job_id, redis.expires_extra_ms, job)
+            pipe.zadd(redis.default_queue_name, {job_id: enqueue_time_ms})
+        await pipe.execute()
+
+
+async def _json_array_response(
+    chunks: AsyncGenerator[list[Any], None],
+    adapter: TypeAdapter[list[Any]],
+) -> StreamingResponse | None:
+    # Streams a JSON array chunk by chunk so large batches are never held in
+    # memory whole. Returns None when there are no rows, so callers can 404.
+    first = await anext(chunks, None)
+    if not first:
+        await chunks.aclose()
+        return None
+
+    async def body() -> AsyncIterator[bytes]:
+        # Closing the generator ends its DB stream even when the client
+        # disconnects mid-response.
+        try:
+            # Each chunk is dumped as one list; strip its brackets to splice it in.
+            yield b"[" + adapter.dump_json(first)[1:-1]
+            async for chunk in chunks:
+                if chunk:
+                    yield b"," + adapter.dump_json(chunk)[1:-1]
+            yield b"]"
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(body(), media_type="application/json")
 
 
 class AddressesAPI:
@@ -92,8 +152,16 @@ class AddressesAPI:
         db: AsyncSession = Depends(get_db),
     ) -> list[AddressValidationResultOut]:
         if async_mode:
-            batch_id = await self.service.create_queued_batch(db, addresses)
-            await request.app.state.redis.enqueue_job("validate_addresses_batch", str(batch_id))
+            # Id is generated here so the INSERT and the enqueue can overlap;
+            # the worker retries if it picks the job up before the commit.
+            batch_id = uuid.uuid4()
+            # TaskGroup cancels the other side if one fails, so the INSERT
+            # never outlives the request's session.
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.service.create_queued_batch(db, addresses, batch_id=batch_id))
+                tg.create_task(
+                    _enqueue_many(request.app.state.redis, "validate_addresses_batch", [batch_id])
+                )
 
             response.status_code = status.HTTP_202_ACCEPTED
             response.headers["X-Validation-Batch-Id"] = str(batch_id)
@@ -107,11 +175,13 @@ class AddressesAPI:
         self,
         batch_id: uuid.UUID,
         db: AsyncSession = Depends(get_db),
-    ) -> list[AddressValidationResultOut]:
-        results = await self.service.get_batch_results(db, batch_id)
-        if not results:
+    ) -> StreamingResponse:
+        response = await _json_array_response(
+            self.service.get_batch_results(db, batch_id), VALIDATION_RESULTS_ADAPTER
+        )
+        if response is None:
             raise HTTPException(status_code=404, detail="batch_id not found or empty")
-        return results
+        return response
 
     async def list_validation_batches(
         self,
@@ -160,7 +230,7 @@ class AddressesAPI:
         if not ok:
             raise HTTPException(status_code=404, detail="batch_id not found")
 
-        await request.app.state.redis.enqueue_job("validate_addresses_batch", str(batch_id))
+        await _enqueue_many(request.app.state.redis, "validate_addresses_batch", [batch_id])
         
     async def recognize_addresses(
         self,
@@ -171,11 +241,14 @@ class AddressesAPI:
         db: AsyncSession = Depends(get_db),
     ) -> list[AddressRecognizeResultOut]:
         if async_mode:
-            rec_id = await self.recognition_service.create_queued_batch(db, payload)
-            await request.app.state.redis.enqueue_job(
-                "recognize_addresses_batch",
-                str(rec_id),
-            )
+            rec_id = uuid.uuid4()
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(
+                    self.recognition_service.create_queued_batch(db, payload, batch_id=rec_id)
+                )
+                tg.create_task(
+                    _enqueue_many(request.app.state.redis, "recognize_addresses_batch", [rec_id])
+                )
 
             response.status_code = status.HTTP_202_ACCEPTED
             response.headers["X-Recognition-Id"] = str(rec_id)
@@ -189,34 +262,13 @@ class AddressesAPI:
         self,
         recognition_id: uuid.UUID,
         db: AsyncSession = Depends(get_db),
-    ) -> list[AddressRecognizeResultOut]:
-        stmt = (
-            select(AddressRecognitionItem)
-            .where(AddressRecognitionItem.batch_id == recognition_id)
-            .order_by(AddressRecognitionItem.created_at)
+    ) -> StreamingResponse:
+        response = await _json_array_response(
+            self.recognition_service.get_results(db, recognition_id), RECOGNITION_RESULTS_ADAPTER
         )
-
-        rows = (await db.execute(stmt)).scalars().all()
-
-        if not rows:
+        if response is None:
             raise HTTPException(status_code=404, detail="recognition_id not found or empty")
-
-        results: list[AddressRecognizeResultOut] = []
-
-        for r in rows:
-            blob = r.recognized or {}
-
-            results.append(
-                AddressRecognizeResultOut(
-                    status="recognized",
-                    original_address=blob.get("original_address") or {},
-                    recognized_address=blob.get("recognized_address") or {},
-                )
-            )
-
-        return results
-
-
+        return response
 
 
 addresses_api = AddressesAPI()
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -17,7 +19,11 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
 
     redis_url: str
+    queue_mode: Literal["classic", "streams"] = "classic"
     sql_echo: bool = False
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
 
     @property
     def database_url(self) -> str:
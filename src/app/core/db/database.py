@@ -1,20 +1,65 @@
+import asyncio
 from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import orjson
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from app.core.config import settings
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.sql_echo,
-    pool_pre_ping=True,
-)
 
-async_session_factory = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+def _json_serializer(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+def make_engine(
+    *,
+    pool_pre_ping: bool = settings.db_pool_pre_ping,
+    max_overflow: int = settings.db_max_overflow,
+) -> AsyncEngine:
+    return create_async_engine(
+        settings.database_url,
+        echo=settings.sql_echo,
+        # Pre-ping costs a round-trip per checkout; processes that keep a
+        # warmed pool (the worker) turn it off.
+        pool_pre_ping=pool_pre_ping,
+        pool_size=settings.db_pool_size,
+        max_overflow=max_overflow,
+        # Queries here are short OLTP lookups/inserts; JIT compile time would
+        # only add latency to them.
+        connect_args={"server_settings": {"jit": "off"}},
+        # The asyncpg dialect installs its own JSON/JSONB codecs on connect and
+        # routes them through these hooks, so this is where orjson plugs in.
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
+    )
+
+
+def make_session_factory(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+engine = make_engine()
+async_session_factory = make_session_factory(engine)
+
+
+async def warm_up_pool(size: int = settings.db_pool_size, bind: AsyncEngine = engine) -> None:
+    # The pool connects lazily; open `size` connections up front so the first
+    # burst of requests doesn't queue behind connection handshakes.
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(
+            *(stack.enter_async_context(bind.connect()) for _ in range(size))
+        )
 
 
 async def get_db() -> AsyncIterator[AsyncSession]:
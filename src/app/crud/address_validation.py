@@ -1,11 +1,33 @@
 import uuid
 from typing import Iterable
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, lambda_stmt, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.address_validation import AddressValidationBatch, AddressValidationItem
 
+# Per-batch item count as a correlated subquery: served by the items(batch_id)
+# index for the single batch instead of grouping every joined item row.
+items_count = (
+    select(func.count(AddressValidationItem.id))
+    .where(AddressValidationItem.batch_id == AddressValidationBatch.id)
+    .correlate(AddressValidationBatch)
+    .scalar_subquery()
+    .label("items_count")
+)
+
+
+async def items_counts(session: AsyncSession, batch_ids: list[uuid.UUID]) -> dict[uuid.UUID, int]:
+    # Counts only the items of an already-paged set of batches.
+    if not batch_ids:
+        return {}
+    rows = await session.execute(
+        select(AddressValidationItem.batch_id, func.count(AddressValidationItem.id))
+        .where(AddressValidationItem.batch_id.in_(batch_ids))
+        .group_by(AddressValidationItem.batch_id)
+    )
+    return dict(rows.all())
+
 
 class AddressValidationCRUD:
     def __init__(self, session: AsyncSession) -> None:
@@ -32,28 +54,27 @@ class AddressValidationCRUD:
         offset: int = 0,
         status: str | None = None,
     ) -> list[tuple[AddressValidationBatch, int]]:
-        stmt = (
-            select(AddressValidationBatch, func.count(AddressValidationItem.id))
-            .outerjoin(AddressValidationItem, AddressValidationItem.batch_id == AddressValidationBatch.id)
-            .group_by(AddressValidationBatch.id)
-            .order_by(AddressValidationBatch.created_at.desc())
-            .limit(limit)
-            .offset(offset)
+        # Page the batches first, then count items for that page only.
+        stmt = lambda_stmt(
+            lambda: select(AddressValidationBatch).order_by(
+                AddressValidationBatch.created_at.desc()
+            )
         )
         if status:
-            stmt = stmt.where(AddressValidationBatch.status == status)
+            stmt += lambda s: s.where(AddressValidationBatch.status == status)
+        stmt += lambda s: s.limit(limit).offset(offset)
 
-        rows = (await self.session.execute(stmt)).all()
-        return [(b, int(cnt)) for (b, cnt) in rows]
+        batches = (await self.session.scalars(stmt)).all()
+        counts = await items_counts(self.session, [b.id for b in batches])
+        return [(b, counts.get(b.id, 0)) for b in batches]
 
     async def get_batch_with_count(
         self, batch_id: uuid.UUID
     ) -> tuple[AddressValidationBatch, int] | None:
-        stmt = (
-            select(AddressValidationBatch, func.count(AddressValidationItem.id))
-            .outerjoin(AddressValidationItem, AddressValidationItem.batch_id == AddressValidationBatch.id)
-            .where(AddressValidationBatch.id == batch_id)
-            .group_by(AddressValidationBatch.id)
+        stmt = lambda_stmt(
+            lambda: select(AddressValidationBatch, items_count).where(
+                AddressValidationBatch.id == batch_id
+            )
         )
         row = (await self.session.execute(stmt)).one_or_none()
         if not row:
@@ -63,12 +84,16 @@ class AddressValidationCRUD:
 
     async def clear_items(self, batch_id: uuid.UUID) -> None:
         await self.session.execute(
-            delete(AddressValidationItem).where(AddressValidationItem.batch_id == batch_id)
+            delete(AddressValidationItem)
+            .where(AddressValidationItem.batch_id == batch_id)
+            .execution_options(synchronize_session=False)
         )
 
     async def delete_batch(self, batch_id: uuid.UUID) -> bool:
-        batch = await self.session.get(AddressValidationBatch, batch_id)
-        if not batch:
-            return False
-        self.session.delete(batch)
-        return True
+        result = await self.session.execute(
+            delete(AddressValidationBatch)
+            .where(AddressValidationBatch.id == batch_id)
+            .returning(AddressValidationBatch.id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none() is not None
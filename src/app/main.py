@@ -3,12 +3,14 @@ from fastapi import FastAPI
 from arq.connections import create_pool, RedisSettings
 
 from app.core.config import settings
+from app.core.db.database import warm_up_pool
 from app.api.v1.routers import router as v1_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.redis = await create_pool(RedisSettings.from_dsn(settings.redis_url))
     try:
+        await warm_up_pool()
         yield
     finally:
         await app.state.redis.close()
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, func
+from sqlalchemy import DateTime, ForeignKey, LargeBinary, SmallInteger, String, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -11,20 +11,28 @@ from app.models.base import Base
 class AddressRecognitionBatch(Base):
     __tablename__ = "address_recognition_batches"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
     status: Mapped[str] = mapped_column(String(32), default="queued")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     request_payload: Mapped[list[dict] | None] = mapped_column(JSONB, nullable=True)
+    # Schema version request_payload was dumped with; see the service's
+    # _PAYLOAD_VERSION.
+    payload_version: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
 
 
 class AddressRecognitionItem(Base):
     __tablename__ = "address_recognition_items"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
     batch_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("address_recognition_batches.id", ondelete="CASCADE"), index=True
     )
 
     status: Mapped[str] = mapped_column(String(32), default="completed")
-    recognized: Mapped[dict] = mapped_column(JSONB)
+    # orjson-encoded blob, see app.services.address_recognition.dump_recognized
+    recognized: Mapped[bytes] = mapped_column(LargeBinary)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime
-from typing import Any, Literal
+from typing import Annotated, Any, Literal, get_args
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 
 BatchStatus = Literal["queued", "processing", "completed", "failed"]
 ResidentialIndicator = Literal["unknown", "yes", "no"]
 ValidationStatus = Literal["verified", "unverified", "error"]
 ValidationLevel = Literal["info", "warning", "error"]
 
+# orjson (JSONB columns and recognition blobs) only handles 64-bit integers.
+PostalCodeInt = Annotated[int, Field(ge=-(2**63), le=2**63 - 1)]
+
+RESIDENTIAL_INDICATORS = frozenset(get_args(ResidentialIndicator))
+
 
 class AddressIn(BaseModel):
     name: str | None = None
@@ -22,7 +27,7 @@ class AddressIn(BaseModel):
 
     city_locality: str = Field(min_length=1)
     state_province: str = Field(min_length=1)
-    postal_code: str | int | None = None
+    postal_code: str | PostalCodeInt | None = None
     country_code: str = Field(min_length=2, max_length=2)
 
     address_residential_indicator: ResidentialIndicator = "unknown"
@@ -34,7 +39,7 @@ class AddressIn(BaseModel):
             return "unknown"
         if isinstance(v, str):
             vv = v.strip().lower()
-            if vv in {"unknown", "yes", "no"}:
+            if vv in RESIDENTIAL_INDICATORS:
                 return vv
         return "unknown"
 
@@ -71,7 +76,7 @@ class AddressRecognizeKnownValues(BaseModel):
     address_line3: str | None = None
     city_locality: str | None = None
     state_province: str | None = None
-    postal_code: str | int | None = None
+    postal_code: str | PostalCodeInt | None = None
     country_code: str | None = None
     address_residential_indicator: ResidentialIndicator | None = None
 
@@ -107,7 +112,7 @@ class PartialAddressOut(BaseModel):
     address_line3: str | None = None
     city_locality: str | None = None
     state_province: str | None = None
-    postal_code: str | int | None = None
+    postal_code: str | PostalCodeInt | None = None
     country_code: str | None = None
     address_residential_indicator: ResidentialIndicator | None = None
 
@@ -116,3 +121,8 @@ class AddressRecognizeResultOut(BaseModel):
     status: Literal["recognized", "error"] = "recognized"
     original_address: PartialAddressOut
     recognized_address: PartialAddressOut
+
+
+# Whole-list validation/serialization in pydantic-core for result chunks.
+VALIDATION_RESULTS_ADAPTER = TypeAdapter(list[AddressValidationResultOut])
+RECOGNITION_RESULTS_ADAPTER = TypeAdapter(list[AddressRecognizeResultOut])
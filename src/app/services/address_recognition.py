@@ -1,11 +1,65 @@
 import uuid
+from collections.abc import AsyncGenerator, Callable
 from typing import Any
 
-from sqlalchemy import delete, select
+import orjson
+from sqlalchemy import delete, exists, insert, lambda_stmt, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.address_recognition import AddressRecognitionBatch, AddressRecognitionItem
-from app.schemas.addresses import AddressIn, AddressOut, AddressRecognizeResultOut, AddressRecognizeIn
+from app.schemas.addresses import (
+    AddressRecognizeIn,
+    AddressRecognizeKnownValues,
+    AddressRecognizeResultOut,
+    PartialAddressOut,
+    RECOGNITION_RESULTS_ADAPTER,
+    RESIDENTIAL_INDICATORS,
+)
+
+# AddressRecognitionItem.recognized is stored as raw bytes: orjson encodes in C
+# and Postgres stores bytea without parsing it the way it does JSONB.
+_dumps = orjson.dumps
+_loads = orjson.loads
+
+# Shape of the AddressRecognizeIn dumps stored in request_payload. Bump it when
+# the schema changes so batches queued before the change are re-validated.
+_PAYLOAD_VERSION = 1
+
+# Rows fetched per round-trip when streaming results.
+_RESULTS_YIELD_PER = 512
+
+_DEFAULT_INDICATOR = "unknown"
+
+
+def _norm_indicator(v: str) -> str:
+    v = v.lower()
+    return v if v in RESIDENTIAL_INDICATORS else _DEFAULT_INDICATOR
+
+
+# Per-key normalizer for stripped string values; any other key is upper-cased.
+_NORMALIZERS: dict[str, Callable[[str], str]] = {
+    "country_code": str.upper,
+    "email": str.lower,
+    "address_residential_indicator": _norm_indicator,
+}
+
+
+# Blob format version. v1 stored both dicts in full; v2 stores the original
+# plus only the keys whose recognized value differs from it.
+_RECOGNIZED_VERSION = 2
+
+
+def dump_recognized(original: dict[str, Any], recognized: dict[str, Any]) -> bytes:
+    changes = {k: v for k, v in recognized.items() if k not in original or original[k] != v}
+    return _dumps({"v": _RECOGNIZED_VERSION, "original_address": original, "changes": changes})
+
+
+def load_recognized(blob: bytes | None) -> tuple[dict[str, Any], dict[str, Any]]:
+    data = _loads(blob) if blob else {}
+    original = data.get("original_address") or {}
+    if "changes" in data:
+        return original, {**original, **data["changes"]}
+    return original, data.get("recognized_address") or {}
 
 
 class AddressRecognitionService:
@@ -13,123 +67,197 @@ class AddressRecognitionService:
         out: dict[str, Any] = {}
 
         for k, v in addr.items():
-            if isinstance(v, str):
-                vv = v.strip()
-                if k == "country_code":
-                    out[k] = vv.upper()
-                elif k == "email":
-                    out[k] = vv.lower()
-                elif k == "address_residential_indicator":
-                    x = vv.strip().lower()
-                    out[k] = x if x in {"unknown", "yes", "no"} else "unknown"
-                else:
-                    out[k] = vv.upper()
-            else:
-                out[k] = v
-
-        if "address_residential_indicator" not in out or out["address_residential_indicator"] is None:
-            out["address_residential_indicator"] = "unknown"
+            out[k] = _NORMALIZERS.get(k, str.upper)(v.strip()) if isinstance(v, str) else v
+
+        if out.get("address_residential_indicator") is None:
+            out["address_residential_indicator"] = _DEFAULT_INDICATOR
 
         return out
 
-    async def create_queued_batch(self, session: AsyncSession, addresses: list[AddressIn]) -> uuid.UUID:
+    def _construct_request(self, data: dict[str, Any]) -> AddressRecognizeIn:
+        known = data.get("address")
+        return AddressRecognizeIn.model_construct(
+            text=data.get("text"),
+            address=AddressRecognizeKnownValues.model_construct(**known) if known else None,
+        )
+
+    async def create_queued_batch(
+        self,
+        session: AsyncSession,
+        addresses: list[AddressRecognizeIn],
+        batch_id: uuid.UUID | None = None,
+    ) -> uuid.UUID:
         payload = [a.model_dump() for a in addresses]
-        batch = AddressRecognitionBatch(status="queued", request_payload=payload)
-        session.add(batch)
-        await session.flush()
-        await session.commit()
-        return batch.id
+
+        stmt = insert(AddressRecognitionBatch).values(
+            status="queued", request_payload=payload, payload_version=_PAYLOAD_VERSION
+        )
+        if batch_id is not None:
+            stmt = stmt.values(id=batch_id)
+
+        async with session.begin():
+            return (
+                await session.execute(stmt.returning(AddressRecognitionBatch.id))
+            ).scalar_one()
 
     async def recognize_and_store(
-        self, session: AsyncSession, addresses: list[AddressIn]
+        self, session: AsyncSession, addresses: list[AddressRecognizeIn]
     ) -> tuple[uuid.UUID, list[AddressRecognizeResultOut]]:
         payload = [a.model_dump() for a in addresses]
-        batch = AddressRecognitionBatch(status="completed", request_payload=payload)
-        session.add(batch)
-        await session.flush()
 
         results: list[AddressRecognizeResultOut] = []
+        blobs: list[bytes] = []
 
-        for addr in addresses:
-            original = addr.model_dump()
+        # The payload dump already holds each nested address as a dict.
+        for item in payload:
+            original = item["address"] or {}
             recognized = self._recognize_one(original)
 
-            session.add(
-                AddressRecognitionItem(
-                    batch_id=batch.id,
-                    status="completed",
-                    recognized={
-                        "original_address": original,
-                        "recognized_address": recognized,
-                    },
-                )
-            )
+            blobs.append(dump_recognized(original, recognized))
 
             results.append(
                 AddressRecognizeResultOut(
-                    original_address=AddressOut.model_validate(original),
-                    recognized_address=AddressOut.model_validate(recognized),
+                    original_address=PartialAddressOut.model_validate(original),
+                    recognized_address=PartialAddressOut.model_validate(recognized),
                 )
             )
 
-        await session.commit()
-        return batch.id, results
+        async with session.begin():
+            batch_id = (
+                await session.execute(
+                    insert(AddressRecognitionBatch)
+                    .values(
+                        status="completed",
+                        request_payload=payload,
+                        payload_version=_PAYLOAD_VERSION,
+                    )
+                    .returning(AddressRecognitionBatch.id)
+                )
+            ).scalar_one()
+
+            if blobs:
+                await session.execute(
+                    insert(AddressRecognitionItem),
+                    [{"batch_id": batch_id, "status": "completed", "recognized": b} for b in blobs],
+                )
+
+        return batch_id, results
 
-    async def process_existing_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> None:
-        batch = await session.get(AddressRecognitionBatch, batch_id)
-        if batch is None:
-            return
+    async def process_existing_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> bool:
+        # Claim the batch with one guarded UPDATE so two workers can't both
+        # process it; "processing" is committed before the work starts.
+        async with session.begin():
+            claimed = (
+                await session.execute(
+                    update(AddressRecognitionBatch)
+                    .where(
+                        AddressRecognitionBatch.id == batch_id,
+                        AddressRecognitionBatch.status.not_in(("processing", "completed")),
+                    )
+                    .values(status="processing")
+                    .returning(
+                        AddressRecognitionBatch.request_payload,
+                        AddressRecognitionBatch.payload_version,
+                    )
+                )
+            ).one_or_none()
 
-        if batch.status in {"processing", "completed"}:
-            return
+            if claimed is None:
+                # Either already taken/done, or not committed yet (see jobs).
+                return bool(
+                    await session.scalar(
+                        select(exists().where(AddressRecognitionBatch.id == batch_id))
+                    )
+                )
 
-        payload = batch.request_payload or []
-        if not payload:
-            batch.status = "failed"
-            await session.commit()
-            return
+            payload, payload_version = claimed
+            payload = payload or []
+            if not payload:
+                await session.execute(
+                    update(AddressRecognitionBatch)
+                    .where(AddressRecognitionBatch.id == batch_id)
+                    .values(status="failed")
+                )
+                return True
 
-        batch.status = "processing"
-        await session.commit()
+        try:
+            await self._complete_batch(session, batch_id, payload, payload_version)
+        except BaseException:
+            # Release the claim so a failed or timed-out job (job_timeout
+            # cancels it) doesn't leave the batch in "processing" forever;
+            # "failed" can be claimed again.
+            await session.rollback()
+            async with session.begin():
+                await session.execute(
+                    update(AddressRecognitionBatch)
+                    .where(
+                        AddressRecognitionBatch.id == batch_id,
+                        AddressRecognitionBatch.status == "processing",
+                    )
+                    .values(status="failed")
+                )
+            raise
 
-        await session.execute(delete(AddressRecognitionItem).where(AddressRecognitionItem.batch_id == batch_id))
+        return True
 
-        addresses = [AddressRecognizeIn.model_validate(x) for x in payload]
+    async def _complete_batch(
+        self,
+        session: AsyncSession,
+        batch_id: uuid.UUID,
+        payload: list[dict[str, Any]],
+        payload_version: int | None,
+    ) -> None:
+        # A current-version payload was dumped from validated input, so it is
+        # constructed without re-validating.
+        if payload_version == _PAYLOAD_VERSION:
+            addresses = [self._construct_request(x) for x in payload]
+        else:
+            addresses = [AddressRecognizeIn.model_validate(x) for x in payload]
+        rows: list[dict[str, Any]] = []
         for addr in addresses:
             original = addr.address.model_dump() if addr.address else {}
             recognized = self._recognize_one(original)
-            session.add(
-                AddressRecognitionItem(
-                    batch_id=batch_id,
-                    status="completed",
-                    recognized={
-                        "original_address": original,
-                        "recognized_address": recognized,
-                    },
-                )
+            rows.append(
+                {
+                    "batch_id": batch_id,
+                    "status": "completed",
+                    "recognized": dump_recognized(original, recognized),
+                }
             )
 
-        b2 = await session.get(AddressRecognitionBatch, batch_id)
-        if b2 is not None:
-            b2.status = "completed"
-
-        await session.commit()
+        # Clearing old items rides along as a CTE on the "completed" UPDATE;
+        # the items INSERT follows in the same transaction.
+        cleared = (
+            delete(AddressRecognitionItem)
+            .where(AddressRecognitionItem.batch_id == batch_id)
+            .cte("cleared")
+        )
+        async with session.begin():
+            await session.execute(
+                update(AddressRecognitionBatch)
+                .where(AddressRecognitionBatch.id == batch_id)
+                .values(status="completed")
+                .add_cte(cleared)
+                .execution_options(synchronize_session=False)
+            )
+            if rows:
+                await session.execute(insert(AddressRecognitionItem), rows)
 
-    async def get_results(self, session: AsyncSession, batch_id: uuid.UUID) -> list[AddressRecognizeResultOut]:
-        stmt = (
-            select(AddressRecognitionItem)
+    async def get_results(
+        self, session: AsyncSession, batch_id: uuid.UUID
+    ) -> AsyncGenerator[list[AddressRecognizeResultOut], None]:
+        stmt = lambda_stmt(
+            lambda: select(AddressRecognitionItem)
             .where(AddressRecognitionItem.batch_id == batch_id)
             .order_by(AddressRecognitionItem.created_at)
         )
-        rows = (await session.execute(stmt)).scalars().all()
+        result = await session.stream_scalars(
+            stmt, execution_options={"yield_per": _RESULTS_YIELD_PER}
+        )
 
-        out: list[AddressRecognizeResultOut] = []
-        for r in rows:
-            blob = r.recognized or {}
-            out.append(
-                AddressRecognizeResultOut(
-                    original_address=AddressOut.model_validate(blob.get("original_address") or {}),
-                    recognized_address=AddressOut.model_validate(blob.get("recognized_address") or {}),
-                )
-            )
-        return out
+        async for rows in result.partitions():
+            raw: list[dict[str, Any]] = []
+            for r in rows:
+                original, recognized = load_recognized(r.recognized)
+                raw.append({"original_address": original, "recognized_address": recognized})
+            yield RECOGNITION_RESULTS_ADAPTER.validate_python(raw)
@@ -1,74 +1,139 @@
 import uuid
+from collections.abc import AsyncGenerator
 from typing import Any
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, exists, insert, lambda_stmt, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.crud.address_validation import items_count, items_counts
 from app.models.address_validation import AddressValidationBatch, AddressValidationItem
 from app.schemas.addresses import (
     AddressIn,
     AddressOut,
     AddressValidationResultOut,
+    RESIDENTIAL_INDICATORS,
     ValidationBatchOut,
     ValidationMessage,
 )
 
+# Rows fetched per round-trip when streaming results.
+_RESULTS_YIELD_PER = 512
 
-class AddressValidationService:
-    def _normalize(self, addr: dict[str, Any]) -> dict[str, Any]:
-        normalized: dict[str, Any] = {}
+# Shape of the AddressIn dumps stored in request_payload. Bump it when AddressIn
+# changes so batches queued before the change are re-validated when processed.
+_PAYLOAD_VERSION = 1
+
+# Max item rows per bulk INSERT; keeps very large batches from building a
+# single oversized executemany.
+_INSERT_CHUNK = 1000
+
+# The only message validation emits today; built and serialized once.
+_MISSING_POSTAL_MSG = ValidationMessage(
+    code="missing_postal_code",
+    message="postal_code is recommended for US",
+    level="warning",
+)
+_MISSING_POSTAL_JSON = _MISSING_POSTAL_MSG.model_dump()
 
-        for key, value in addr.items():
-            if isinstance(value, str):
-                v = value.strip()
+# Shared (never mutated) item values for the two message lists every row
+# produces today.
+_NO_MESSAGES_JSON: list[dict[str, Any]] = []
+_MISSING_POSTAL_MESSAGES_JSON = [_MISSING_POSTAL_JSON]
 
-                if key == "address_residential_indicator":
-                    v = v.lower()
-                    if v not in {"unknown", "yes", "no"}:
-                        v = "unknown"
-                    normalized[key] = v
-                    continue
 
-                if key == "country_code":
-                    normalized[key] = v.upper()
-                    continue
+def _messages_json(messages: list[ValidationMessage]) -> list[dict[str, Any]]:
+    if not messages:
+        return _NO_MESSAGES_JSON
+    if len(messages) == 1 and messages[0] is _MISSING_POSTAL_MSG:
+        return _MISSING_POSTAL_MESSAGES_JSON
+    return [_MISSING_POSTAL_JSON if m is _MISSING_POSTAL_MSG else m.model_dump() for m in messages]
 
-                if key == "email":
-                    normalized[key] = v.lower()
-                    continue
 
-                normalized[key] = v.upper()
-            else:
-                normalized[key] = value
+def _upper(v: Any) -> Any:
+    return v.strip().upper() if isinstance(v, str) else v
 
-        if "address_residential_indicator" not in normalized:
-            normalized["address_residential_indicator"] = "unknown"
 
-        return normalized
+def _lower(v: Any) -> Any:
+    return v.strip().lower() if isinstance(v, str) else v
 
-    def _status_and_messages(self, addr: AddressIn) -> tuple[str, list[ValidationMessage]]:
+
+async def _insert_items(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    for i in range(0, len(rows), _INSERT_CHUNK):
+        await session.execute(insert(AddressValidationItem), rows[i : i + _INSERT_CHUNK])
+
+
+class AddressValidationService:
+    def _normalize(self, addr: dict[str, Any]) -> dict[str, Any]:
+        # Unrolled over the AddressIn fields: one lookup and one transform per
+        # key instead of a generic loop branching on every key name.
+        get = addr.get
+        ari = get("address_residential_indicator")
+        ari = ari.strip().lower() if isinstance(ari, str) else None
+
+        return {
+            "name": _upper(get("name")),
+            "phone": _upper(get("phone")),
+            "email": _lower(get("email")),
+            "company_name": _upper(get("company_name")),
+            "address_line1": _upper(get("address_line1")),
+            "address_line2": _upper(get("address_line2")),
+            "address_line3": _upper(get("address_line3")),
+            "city_locality": _upper(get("city_locality")),
+            "state_province": _upper(get("state_province")),
+            "postal_code": _upper(get("postal_code")),
+            "country_code": _upper(get("country_code")),
+            "address_residential_indicator": ari if ari in RESIDENTIAL_INDICATORS else "unknown",
+        }
+
+    def _status_and_messages_from_dict(
+        self, addr: dict[str, Any]
+    ) -> tuple[str, list[ValidationMessage]]:
         msgs: list[ValidationMessage] = []
 
-        if addr.country_code.upper() == "US" and not addr.postal_code:
-            msgs.append(
-                ValidationMessage(
-                    code="missing_postal_code",
-                    message="postal_code is recommended for US",
-                    level="warning",
-                )
-            )
+        if addr["country_code"].upper() == "US" and not addr.get("postal_code"):
+            msgs.append(_MISSING_POSTAL_MSG)
 
         return "verified", msgs
 
-    async def create_queued_batch(self, session: AsyncSession, addresses: list[AddressIn]) -> uuid.UUID:
+    async def _lock_batch(
+        self, session: AsyncSession, batch_id: uuid.UUID
+    ) -> tuple[AddressValidationBatch, bool] | None:
+        # Batch row FOR UPDATE plus whether it has items, in one round-trip.
+        row = (
+            await session.execute(
+                select(
+                    AddressValidationBatch,
+                    exists()
+                    .where(AddressValidationItem.batch_id == AddressValidationBatch.id)
+                    .label("has_items"),
+                )
+                .where(AddressValidationBatch.id == batch_id)
+                .with_for_update(of=AddressValidationBatch)
+            )
+        ).first()
+        if row is None:
+            return None
+        batch, has_items = row
+        return batch, bool(has_items)
+
+    async def create_queued_batch(
+        self,
+        session: AsyncSession,
+        addresses: list[AddressIn],
+        batch_id: uuid.UUID | None = None,
+    ) -> uuid.UUID:
         payload = [a.model_dump() for a in addresses]
 
-        async with session.begin():
-            batch = AddressValidationBatch(status="queued", request_payload=payload)
-            session.add(batch)
-            await session.flush()
+        stmt = insert(AddressValidationBatch).values(
+            status="queued", request_payload=payload, payload_version=_PAYLOAD_VERSION
+        )
+        if batch_id is not None:
+            stmt = stmt.values(id=batch_id)
 
-        return batch.id
+        async with session.begin():
+            return (
+                await session.execute(stmt.returning(AddressValidationBatch.id))
+            ).scalar_one()
 
     async def validate_and_store(
         self,
@@ -76,123 +141,135 @@ class AddressValidationService:
         addresses: list[AddressIn],
     ) -> tuple[uuid.UUID, list[AddressValidationResultOut]]:
         results: list[AddressValidationResultOut] = []
+        rows: list[dict[str, Any]] = []
         payload = [a.model_dump() for a in addresses]
 
         async with session.begin():
-            batch = AddressValidationBatch(status="completed", request_payload=payload)
-            session.add(batch)
-            await session.flush()
+            batch_id = (
+                await session.execute(
+                    insert(AddressValidationBatch)
+                    .values(
+                        status="completed",
+                        request_payload=payload,
+                        payload_version=_PAYLOAD_VERSION,
+                    )
+                    .returning(AddressValidationBatch.id)
+                )
+            ).scalar_one()
 
-            for addr in addresses:
-                original_dict = addr.model_dump()
+            for original_dict in payload:
                 matched_dict = self._normalize(original_dict)
 
-                status, messages = self._status_and_messages(addr)
-                messages_json = [m.model_dump() for m in messages]
-
-                session.add(
-                    AddressValidationItem(
-                        batch_id=batch.id,
-                        status=status,
-                        original_address=original_dict,
-                        matched_address=matched_dict,
-                        messages=messages_json,
-                    )
+                status, messages = self._status_and_messages_from_dict(original_dict)
+                messages_json = _messages_json(messages)
+
+                rows.append(
+                    {
+                        "batch_id": batch_id,
+                        "status": status,
+                        "original_address": original_dict,
+                        "matched_address": matched_dict,
+                        "messages": messages_json,
+                    }
                 )
 
-                original_for_out = dict(original_dict)
-                ari = original_for_out.get("address_residential_indicator")
-                if isinstance(ari, str):
-                    v = ari.strip().lower()
-                    original_for_out["address_residential_indicator"] = (
-                        v if v in {"unknown", "yes", "no"} else "unknown"
-                    )
-                elif ari is None:
-                    original_for_out["address_residential_indicator"] = "unknown"
+                # _normalize already coerced the indicator; reuse it.
+                original_for_out = {
+                    **original_dict,
+                    "address_residential_indicator": matched_dict["address_residential_indicator"],
+                }
 
+                # Both dicts come from validated AddressIn input, so the output
+                # models are constructed without a second validation pass.
                 results.append(
-                    AddressValidationResultOut(
+                    AddressValidationResultOut.model_construct(
                         status=status,
-                        original_address=AddressOut.model_validate(original_for_out),
-                        matched_address=AddressOut.model_validate(matched_dict),
+                        original_address=AddressOut.model_construct(**original_for_out),
+                        matched_address=AddressOut.model_construct(**matched_dict),
                         messages=messages,
                     )
                 )
 
-        return batch.id, results
+            await _insert_items(session, rows)
 
-    async def process_existing_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> None:
-        async with session.begin():
-            batch = (
-                await session.execute(
-                    select(AddressValidationBatch)
-                    .where(AddressValidationBatch.id == batch_id)
-                    .with_for_update()
-                )
-            ).scalars().first()
+        return batch_id, results
 
-            if batch is None:
-                return
+    async def process_existing_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> bool:
+        async with session.begin():
+            row = await self._lock_batch(session, batch_id)
+            if row is None:
+                return False
 
-            existing_item_id = (
-                await session.execute(
-                    select(AddressValidationItem.id)
-                    .where(AddressValidationItem.batch_id == batch_id)
-                    .limit(1)
-                )
-            ).scalar_one_or_none()
+            batch, has_items = row
 
-            if batch.status == "completed" and existing_item_id is not None:
-                return
+            if batch.status == "completed" and has_items:
+                return True
 
             payload = batch.request_payload or []
             if not payload:
                 batch.status = "failed"
-                return
+                return True
 
-            batch.status = "processing"
+            # No "processing" write: the row is locked and nothing outside this
+            # transaction would see it before "completed" below.
+            if has_items:
+                await session.execute(
+                    delete(AddressValidationItem)
+                    .where(AddressValidationItem.batch_id == batch_id)
+                    .execution_options(synchronize_session=False)
+                )
 
-            await session.execute(delete(AddressValidationItem).where(AddressValidationItem.batch_id == batch_id))
+            # A current-version payload was dumped from validated AddressIn and
+            # is used as-is; anything older goes through AddressIn again.
+            if batch.payload_version != _PAYLOAD_VERSION:
+                payload = [AddressIn.model_validate(a).model_dump() for a in payload]
 
-            addresses = [AddressIn.model_validate(a) for a in payload]
+            rows: list[dict[str, Any]] = []
 
-            for addr in addresses:
-                original_dict = addr.model_dump()
+            for original_dict in payload:
                 matched_dict = self._normalize(original_dict)
-                status, messages = self._status_and_messages(addr)
-
-                session.add(
-                    AddressValidationItem(
-                        batch_id=batch_id,
-                        status=status,
-                        original_address=original_dict,
-                        matched_address=matched_dict,
-                        messages=[m.model_dump() for m in messages],
-                    )
+                status, messages = self._status_and_messages_from_dict(original_dict)
+
+                rows.append(
+                    {
+                        "batch_id": batch_id,
+                        "status": status,
+                        "original_address": original_dict,
+                        "matched_address": matched_dict,
+                        "messages": _messages_json(messages),
+                    }
                 )
 
+            await _insert_items(session, rows)
+
             batch.status = "completed"
 
-    async def get_batch_results(self, session: AsyncSession, batch_id: uuid.UUID) -> list[AddressValidationResultOut]:
-        q = (
-            select(AddressValidationItem)
+        return True
+
+    async def get_batch_results(
+        self, session: AsyncSession, batch_id: uuid.UUID
+    ) -> AsyncGenerator[list[AddressValidationResultOut], None]:
+        q = lambda_stmt(
+            lambda: select(AddressValidationItem)
             .where(AddressValidationItem.batch_id == batch_id)
             .order_by(AddressValidationItem.created_at)
         )
-        rows = (await session.execute(q)).scalars().all()
+        result = await session.stream_scalars(
+            q, execution_options={"yield_per": _RESULTS_YIELD_PER}
+        )
 
-        out: list[AddressValidationResultOut] = []
-        for r in rows:
-            out.append(
-                AddressValidationResultOut(
+        # Items are written only by this service from validated input, so the
+        # stored JSON is constructed back into models without re-validating.
+        async for rows in result.partitions():
+            yield [
+                AddressValidationResultOut.model_construct(
                     status=r.status,
-                    original_address=r.original_address,
-                    matched_address=r.matched_address,
-                    messages=[ValidationMessage.model_validate(m) for m in (r.messages or [])],
+                    original_address=AddressOut.model_construct(**r.original_address),
+                    matched_address=AddressOut.model_construct(**r.matched_address),
+                    messages=[ValidationMessage.model_construct(**m) for m in r.messages or ()],
                 )
-            )
-
-        return out
+                for r in rows
+            ]
 
     async def list_batches(
         self,
@@ -202,32 +279,29 @@ class AddressValidationService:
         offset: int = 0,
         status: str | None = None,
     ) -> list[ValidationBatchOut]:
-        stmt = (
-            select(
-                AddressValidationBatch,
-                func.count(AddressValidationItem.id).label("items_count"),
+        # Page the batches first, then count items for that page only.
+        stmt = lambda_stmt(
+            lambda: select(AddressValidationBatch).order_by(
+                AddressValidationBatch.created_at.desc()
             )
-            .outerjoin(AddressValidationItem, AddressValidationItem.batch_id == AddressValidationBatch.id)
-            .group_by(AddressValidationBatch.id)
-            .order_by(AddressValidationBatch.created_at.desc())
-            .limit(limit)
-            .offset(offset)
         )
 
         if status:
-            stmt = stmt.where(AddressValidationBatch.status == status)
+            stmt += lambda s: s.where(AddressValidationBatch.status == status)
+        stmt += lambda s: s.limit(limit).offset(offset)
 
-        rows = (await session.execute(stmt)).all()
+        batches = (await session.scalars(stmt)).all()
+        counts = await items_counts(session, [b.id for b in batches])
 
         return [
             ValidationBatchOut(
                 id=b.id,
                 status=b.status,
                 created_at=b.created_at,
-                items_count=int(cnt or 0),
+                items_count=counts.get(b.id, 0),
                 request_payload=b.request_payload,
             )
-            for (b, cnt) in rows
+            for b in batches
         ]
 
     async def get_batch(
@@ -235,14 +309,10 @@ class AddressValidationService:
         session: AsyncSession,
         batch_id: uuid.UUID,
     ) -> ValidationBatchOut | None:
-        stmt = (
-            select(
-                AddressValidationBatch,
-                func.count(AddressValidationItem.id).label("items_count"),
+        stmt = lambda_stmt(
+            lambda: select(AddressValidationBatch, items_count).where(
+                AddressValidationBatch.id == batch_id
             )
-            .outerjoin(AddressValidationItem, AddressValidationItem.batch_id == AddressValidationBatch.id)
-            .where(AddressValidationBatch.id == batch_id)
-            .group_by(AddressValidationBatch.id)
         )
 
         row = (await session.execute(stmt)).first()
@@ -259,27 +329,26 @@ class AddressValidationService:
         )
 
     async def delete_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> bool:
+        # Items go with the batch via ON DELETE CASCADE.
         async with session.begin():
-            batch = await session.get(AddressValidationBatch, batch_id)
-            if batch is None:
-                return False
-            await session.execute(delete(AddressValidationItem).where(AddressValidationItem.batch_id == batch_id))
-            await session.delete(batch)
-        return True
-
-    async def requeue_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> bool:
-        async with session.begin():
-            batch = (
+            deleted_id = (
                 await session.execute(
-                    select(AddressValidationBatch)
+                    delete(AddressValidationBatch)
                     .where(AddressValidationBatch.id == batch_id)
-                    .with_for_update()
+                    .returning(AddressValidationBatch.id)
+                    .execution_options(synchronize_session=False)
                 )
-            ).scalars().first()
+            ).scalar_one_or_none()
+        return deleted_id is not None
 
-            if batch is None:
+    async def requeue_batch(self, session: AsyncSession, batch_id: uuid.UUID) -> bool:
+        async with session.begin():
+            row = await self._lock_batch(session, batch_id)
+            if row is None:
                 return False
 
+            batch, has_items = row
+
             if batch.status == "processing":
                 raise RuntimeError("processing")
 
@@ -288,8 +357,11 @@ class AddressValidationService:
                 return False
 
             batch.status = "queued"
-            await session.execute(
-                delete(AddressValidationItem).where(AddressValidationItem.batch_id == batch_id)
-            )
+            if has_items:
+                await session.execute(
+                    delete(AddressValidationItem)
+                    .where(AddressValidationItem.batch_id == batch_id)
+                    .execution_options(synchronize_session=False)
+                )
 
         return True
@@ -1,8 +1,15 @@
+import asyncio
 from urllib.parse import urlparse
 from arq.connections import RedisSettings
 
 from app.core.config import settings
-from app.workers.jobs import validate_addresses_batch, recognize_addresses_batch
+from app.core.db.database import make_engine, make_session_factory, warm_up_pool
+from app.workers import streams
+from app.workers.jobs import (
+    MISSING_BATCH_TRIES,
+    validate_addresses_batch,
+    recognize_addresses_batch,
+)
 
 
 def _redis_settings_from_url(url: str) -> RedisSettings:
@@ -17,7 +24,55 @@ def _redis_settings_from_url(url: str) -> RedisSettings:
     )
 
 
+async def startup(ctx) -> None:
+    # Jobs share one engine whose pool is exactly db_pool_size: no overflow
+    # past what max_jobs can use, and no pre-ping since the warmed
+    # connections are reused constantly. Open them all up front.
+    ctx["engine"] = make_engine(max_overflow=0, pool_pre_ping=False)
+    ctx["session_factory"] = make_session_factory(ctx["engine"])
+    await warm_up_pool(settings.db_pool_size, bind=ctx["engine"])
+
+    if settings.queue_mode == "streams":
+        ctx["stream_consumer"] = asyncio.create_task(
+            streams.consume(
+                ctx,
+                {f.__name__: f for f in WorkerSettings.functions},
+                max_jobs=max(settings.db_pool_size - WorkerSettings.max_jobs, 1),
+                job_timeout=WorkerSettings.job_timeout,
+            )
+        )
+
+
+async def shutdown(ctx) -> None:
+    task = ctx.get("stream_consumer")
+    if task is not None:
+        task.cancel()
+
+    engine = ctx.get("engine")
+    if engine is not None:
+        await engine.dispose()
+
+
+# ARQ slots kept for deferred retries in streams mode.
+_STREAMS_RETRY_JOBS = 2
+
+
 class WorkerSettings:
     redis_settings = _redis_settings_from_url(settings.redis_url)
     functions = [validate_addresses_batch, recognize_addresses_batch]
-    max_jobs = 10
+    on_startup = startup
+    on_shutdown = shutdown
+    # Jobs are I/O bound and hold one DB connection each, so concurrency
+    # follows the pool size. In streams mode ARQ only runs deferred retries
+    # and the stream consumer gets the rest of the pool, so the two together
+    # stay within db_pool_size.
+    max_jobs = (
+        settings.db_pool_size
+        if settings.queue_mode == "classic"
+        else max(min(_STREAMS_RETRY_JOBS, settings.db_pool_size // 2), 1)
+    )
+    # Nothing reads job results; a stuck job shouldn't pin a connection.
+    keep_result = 0
+    job_timeout = 60
+    # Room for the missing-batch retry schedule (arq defaults to 5 tries).
+    max_tries = MISSING_BATCH_TRIES
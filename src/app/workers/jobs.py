@@ -1,20 +1,44 @@
+import logging
 import uuid
 
-from app.core.db.database import async_session_factory
+from arq import Retry
+
 from app.services.address_validation import AddressValidationService
 from app.services.address_recognition import AddressRecognitionService
 
+logger = logging.getLogger(__name__)
+
+# The API enqueues async batches concurrently with their INSERT, so a job can
+# start before the batch row is committed. That INSERT may itself wait up to
+# the pool checkout timeout (30s) under load, so retries back off
+# exponentially over ~1 minute (0.5s, 1s, ... 32s) before giving up.
+MISSING_BATCH_TRIES = 8
+_MISSING_BATCH_BACKOFF = 0.5
+
+
+def _retry_missing_batch(ctx, batch_id: str) -> None:
+    job_try = ctx.get("job_try", 1)
+    if job_try < MISSING_BATCH_TRIES:
+        raise Retry(defer=_MISSING_BATCH_BACKOFF * 2 ** (job_try - 1))
+    logger.error("batch %s not found after %d tries; giving up", batch_id, job_try)
+
 
 async def validate_addresses_batch(ctx, batch_id: str) -> None:
     service = AddressValidationService()
     batch_uuid = uuid.UUID(batch_id)
 
-    async with async_session_factory() as session:
-        await service.process_existing_batch(session, batch_uuid)
+    async with ctx["session_factory"]() as session:
+        found = await service.process_existing_batch(session, batch_uuid)
+
+    if not found:
+        _retry_missing_batch(ctx, batch_id)
 
 async def recognize_addresses_batch(ctx, batch_id: str) -> None:
     service = AddressRecognitionService()
     batch_uuid = uuid.UUID(batch_id)
 
-    async with async_session_factory() as session:
-        await service.process_existing_batch(session, batch_uuid)
\ No newline at end of file
+    async with ctx["session_factory"]() as session:
+        found = await service.process_existing_batch(session, batch_uuid)
+
+    if not found:
+        _retry_missing_batch(ctx, batch_id)
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from arq import Retry
+from arq.connections import ArqRedis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+# Push-based dispatch for settings.queue_mode == "streams": consumers block on
+# XREADGROUP and see a job as soon as it is added, instead of ARQ polling its
+# queue every poll_delay. Deferred retries still go through ARQ's sorted set.
+STREAM_KEY = "arq:stream"
+GROUP_NAME = "workers"
+_READ_COUNT = 16
+_BLOCK_MS = 5000
+
+# Entries still pending on a consumer after this many job timeouts belong to a
+# worker that died or restarted; live workers ack within one job_timeout.
+_RECLAIM_IDLE_TIMEOUTS = 2
+_RECLAIM_EVERY = 30.0
+# A job that keeps taking its worker down is dropped after this many deliveries.
+_MAX_DELIVERIES = 3
+
+_RETRY_MAX_DELAY = 30.0
+
+JobFunction = Callable[..., Awaitable[Any]]
+Entry = tuple[bytes, dict[bytes, bytes]]
+
+
+def add_job(pipe: Pipeline, function: str, arg: str) -> None:
+    pipe.xadd(STREAM_KEY, {"function": function, "arg": arg})
+
+
+async def _ensure_group(redis: ArqRedis) -> None:
+    try:
+        await redis.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _finish(redis: ArqRedis, *entry_ids: bytes) -> None:
+    # Done entries are deleted as well as acked so the stream only ever holds
+    # unfinished jobs. MULTI keeps the pair together, so an entry is never
+    # left deleted but still pending.
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.xack(STREAM_KEY, GROUP_NAME, *entry_ids)
+        pipe.xdel(STREAM_KEY, *entry_ids)
+        await pipe.execute()
+
+
+async def _run_entry(
+    ctx: dict[str, Any],
+    functions: dict[str, JobFunction],
+    entry_id: bytes,
+    fields: dict[bytes, bytes],
+    job_timeout: float,
+) -> None:
+    redis: ArqRedis = ctx["redis"]
+    name = fields[b"function"].decode()
+    arg = fields[b"arg"].decode()
+
+    try:
+        async with asyncio.timeout(job_timeout):
+            await functions[name]({**ctx, "job_id": entry_id.decode(), "job_try": 1}, arg)
+    except Retry as r:
+        await redis.enqueue_job(name, arg, _defer_by=(r.defer_score or 0) / 1000, _job_try=2)
+    except Exception:
+        # Same as a failed classic ARQ job: logged and not re-run.
+        logger.exception("stream job %s %s(%s) failed", entry_id.decode(), name, arg)
+
+    await _finish(redis, entry_id)
+
+
+async def _claim(
+    redis: ArqRedis,
+    consumer: str,
+    start: bytes | str,
+    count: int,
+    min_idle_ms: int,
+    running: int,
+) -> tuple[bytes | str, list[Entry]]:
+    next_start, claimed, *_ = await redis.xautoclaim(
+        STREAM_KEY, GROUP_NAME, consumer, min_idle_ms, start_id=start, count=count
+    )
+    # Redis 6.2 returns an entry deleted while pending with nil fields, which
+    # redis-py parses as {} (or as (None, None) for a nil entry). Such ids
+    # only linger in the PEL, so ack them straight away.
+    deleted = [entry_id for entry_id, fields in claimed if entry_id is not None and not fields]
+    if deleted:
+        await _finish(redis, *deleted)
+    entries = [(entry_id, fields) for entry_id, fields in claimed if fields]
+    if not entries:
+        return next_start, []
+
+    pending = await redis.xpending_range(
+        STREAM_KEY,
+        GROUP_NAME,
+        min=entries[0][0],
+        max=entries[-1][0],
+        # Our running entries can fall inside the same id range.
+        count=len(entries) + running,
+        consumername=consumer,
+    )
+    deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+
+    dropped = [e for e, _ in entries if deliveries.get(e, 0) > _MAX_DELIVERIES]
+    if dropped:
+        logger.error(
+            "dropping stream jobs delivered more than %d times: %s", _MAX_DELIVERIES, dropped
+        )
+        await _finish(redis, *dropped)
+
+    return next_start, [e for e in entries if e[0] not in dropped]
+
+
+async def _acquire_slots(slots: asyncio.Semaphore) -> int:
+    # Wait for one free slot, then take any others free right now, so reads
+    # never pull more entries than can start immediately.
+    await slots.acquire()
+    n = 1
+    while n < _READ_COUNT and not slots.locked():
+        await slots.acquire()
+        n += 1
+    return n
+
+
+async def consume(
+    ctx: dict[str, Any],
+    functions: dict[str, JobFunction],
+    *,
+    max_jobs: int,
+    job_timeout: float,
+) -> None:
+    redis: ArqRedis = ctx["redis"]
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    min_idle_ms = int(job_timeout * _RECLAIM_IDLE_TIMEOUTS * 1000)
+
+    slots = asyncio.Semaphore(max_jobs)
+    running: set[asyncio.Task[None]] = set()
+
+    def _done(task: asyncio.Task[None]) -> None:
+        running.discard(task)
+        slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            # Left pending (e.g. Redis failed mid-ack); a later reclaim re-runs it.
+            logger.error("stream job task failed", exc_info=task.exception())
+
+    group_ready = False
+    claim_from: bytes | str | None = "0-0"  # reclaim pass in progress; starts at startup
+    next_claim = 0.0
+    delay = 1.0
+
+    try:
+        while True:
+            held = await _acquire_slots(slots)
+            try:
+                if not group_ready:
+                    await _ensure_group(redis)
+                    group_ready = True
+
+                if claim_from is None and time.monotonic() >= next_claim:
+                    claim_from = "0-0"
+
+                if claim_from is not None:
+                    claim_from, entries = await _claim(
+                        redis, consumer, claim_from, held, min_idle_ms, len(running)
+                    )
+                    if claim_from in (b"0-0", "0-0"):
+                        claim_from = None
+                        next_claim = time.monotonic() + _RECLAIM_EVERY
+                else:
+                    resp = await redis.xreadgroup(
+                        GROUP_NAME,
+                        consumer,
+                        {STREAM_KEY: ">"},
+                        count=held,
+                        block=_BLOCK_MS,
+                    )
+                    entries = [e for _stream, stream_entries in resp or [] for e in stream_entries]
+
+                for entry_id, fields in entries:
+                    task = asyncio.create_task(
+                        _run_entry(ctx, functions, entry_id, fields, job_timeout)
+                    )
+                    held -= 1
+                    running.add(task)
+                    task.add_done_callback(_done)
+
+                delay = 1.0
+            except Exception:
+                # Keep dispatching through Redis outages instead of dying
+                # silently; the group is re-checked after reconnecting.
+                logger.exception("stream consumer error; retrying in %.0fs", delay)
+                group_ready = False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _RETRY_MAX_DELAY)
+            finally:
+                for _ in range(held):
+                    slots.release()
+    finally:
+        # Interrupted jobs stay pending and are reclaimed by another worker.
+        for task in list(running):
+            task.cancel()
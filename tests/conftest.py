@@ -0,0 +1,8 @@
+import os
+
+# app.core.config builds Settings at import time; tests never connect.
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
@@ -0,0 +1,42 @@
+import logging
+
+import pytest
+from arq import Retry
+
+from app.workers.jobs import MISSING_BATCH_TRIES, _retry_missing_batch
+
+
+@pytest.mark.parametrize(
+    ("job_try", "defer_ms"),
+    [(1, 500), (2, 1000), (3, 2000), (MISSING_BATCH_TRIES - 1, 32000)],
+)
+def test_retry_backs_off_exponentially(job_try, defer_ms):
+    with pytest.raises(Retry) as exc:
+        _retry_missing_batch({"job_try": job_try}, "b1")
+
+    assert exc.value.defer_score == defer_ms
+
+
+def test_retry_defaults_to_first_try():
+    with pytest.raises(Retry) as exc:
+        _retry_missing_batch({}, "b1")
+
+    assert exc.value.defer_score == 500
+
+
+def test_retry_window_covers_pool_timeout():
+    total = 0
+    for job_try in range(1, MISSING_BATCH_TRIES):
+        with pytest.raises(Retry) as exc:
+            _retry_missing_batch({"job_try": job_try}, "b1")
+        total += exc.value.defer_score
+
+    # The batch INSERT can wait out the 30s pool checkout timeout.
+    assert total > 30_000
+
+
+def test_gives_up_on_last_try(caplog):
+    with caplog.at_level(logging.ERROR, logger="app.workers.jobs"):
+        _retry_missing_batch({"job_try": MISSING_BATCH_TRIES}, "b1")
+
+    assert "batch b1 not found after 8 tries; giving up" in caplog.text
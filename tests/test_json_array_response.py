@@ -0,0 +1,107 @@
+from collections.abc import AsyncIterator
+from typing import Any
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.api.v1.endpoints.addresses import _json_array_response
+from app.schemas.addresses import (
+    RECOGNITION_RESULTS_ADAPTER,
+    AddressRecognizeResultOut,
+    PartialAddressOut,
+)
+
+
+def _result(city: str) -> AddressRecognizeResultOut:
+    return AddressRecognizeResultOut(
+        original_address=PartialAddressOut(city_locality=city.lower()),
+        recognized_address=PartialAddressOut(city_locality=city),
+    )
+
+
+async def _chunks(*chunks: list[Any]) -> AsyncIterator[list[Any]]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def _body(response: StreamingResponse) -> Any:
+    return orjson.loads(b"".join([part async for part in response.body_iterator]))
+
+
+def _expected(*chunks: list[AddressRecognizeResultOut]) -> Any:
+    return [r.model_dump(mode="json") for chunk in chunks for r in chunk]
+
+
+async def test_no_chunks_returns_none():
+    assert await _json_array_response(_chunks(), RECOGNITION_RESULTS_ADAPTER) is None
+
+
+async def test_empty_first_chunk_returns_none():
+    assert await _json_array_response(_chunks([]), RECOGNITION_RESULTS_ADAPTER) is None
+
+
+async def test_one_chunk():
+    chunk = [_result("AUSTIN"), _result("DALLAS")]
+
+    response = await _json_array_response(_chunks(chunk), RECOGNITION_RESULTS_ADAPTER)
+
+    assert response.media_type == "application/json"
+    assert await _body(response) == _expected(chunk)
+
+
+async def test_single_item_chunk():
+    chunk = [_result("AUSTIN")]
+
+    response = await _json_array_response(_chunks(chunk), RECOGNITION_RESULTS_ADAPTER)
+
+    assert await _body(response) == _expected(chunk)
+
+
+async def test_many_chunks():
+    chunks = [[_result("AUSTIN"), _result("DALLAS")], [_result("HOUSTON")], [_result("WACO")]]
+
+    response = await _json_array_response(_chunks(*chunks), RECOGNITION_RESULTS_ADAPTER)
+
+    assert await _body(response) == _expected(*chunks)
+
+
+async def test_empty_later_chunk_is_skipped():
+    chunks = [[_result("AUSTIN")], [], [_result("DALLAS")]]
+
+    response = await _json_array_response(_chunks(*chunks), RECOGNITION_RESULTS_ADAPTER)
+
+    assert await _body(response) == _expected(*chunks)
+
+
+async def test_chunks_closed_after_partial_read():
+    closed = False
+
+    async def chunks():
+        nonlocal closed
+        try:
+            yield [_result("AUSTIN")]
+            yield [_result("DALLAS")]
+        finally:
+            closed = True
+
+    response = await _json_array_response(chunks(), RECOGNITION_RESULTS_ADAPTER)
+    body = response.body_iterator
+    await anext(body)
+    await body.aclose()
+
+    assert closed
+
+
+async def test_chunks_closed_when_empty():
+    closed = False
+
+    async def chunks():
+        nonlocal closed
+        try:
+            yield []
+            yield [_result("AUSTIN")]
+        finally:
+            closed = True
+
+    assert await _json_array_response(chunks(), RECOGNITION_RESULTS_ADAPTER) is None
+    assert closed
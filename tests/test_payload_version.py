@@ -0,0 +1,132 @@
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+
+from app.services import address_recognition, address_validation
+from app.services.address_recognition import AddressRecognitionService, load_recognized
+from app.services.address_validation import AddressValidationService
+
+BATCH_ID = uuid.uuid4()
+
+# Missing optional keys, as an older schema may have stored them.
+VALIDATION_PAYLOAD = [
+    {
+        "address_line1": "1 main st",
+        "city_locality": "austin",
+        "state_province": "tx",
+        "country_code": "us",
+    }
+]
+RECOGNITION_PAYLOAD = [
+    {
+        "text": "1 main st austin",
+        "address": {
+            "name": None,
+            "address_line1": "1 main st",
+            "address_line2": None,
+            "address_line3": None,
+            "city_locality": "austin",
+            "state_province": None,
+            "postal_code": 78701,
+            "country_code": "us",
+            "address_residential_indicator": None,
+        },
+    }
+]
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.executed: list[tuple[Any, Any]] = []
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, stmt: Any, params: Any = None) -> None:
+        self.executed.append((stmt, params))
+
+
+async def _validate(monkeypatch, payload_version: int | None) -> dict[str, Any]:
+    batch = SimpleNamespace(
+        status="queued", request_payload=VALIDATION_PAYLOAD, payload_version=payload_version
+    )
+    service = AddressValidationService()
+
+    async def lock_batch(session, batch_id):
+        return batch, False
+
+    inserted: list[dict[str, Any]] = []
+
+    async def insert_items(session, rows):
+        inserted.extend(rows)
+
+    monkeypatch.setattr(service, "_lock_batch", lock_batch)
+    monkeypatch.setattr(address_validation, "_insert_items", insert_items)
+
+    assert await service.process_existing_batch(FakeSession(), BATCH_ID)
+    assert batch.status == "completed"
+    return inserted[0]["original_address"]
+
+
+async def test_validation_current_payload_used_as_is(monkeypatch):
+    original = await _validate(monkeypatch, address_validation._PAYLOAD_VERSION)
+
+    assert original == VALIDATION_PAYLOAD[0]
+
+
+@pytest.mark.parametrize("payload_version", [None, address_validation._PAYLOAD_VERSION - 1])
+async def test_validation_stale_payload_revalidated(monkeypatch, payload_version):
+    original = await _validate(monkeypatch, payload_version)
+
+    assert original["name"] is None
+    assert original["address_residential_indicator"] == "unknown"
+
+
+async def _recognize(
+    monkeypatch, payload: list[dict[str, Any]], payload_version: int | None
+) -> tuple[dict[str, Any], int]:
+    service = AddressRecognitionService()
+    constructed = 0
+    construct = service._construct_request
+
+    def construct_request(data):
+        nonlocal constructed
+        constructed += 1
+        return construct(data)
+
+    monkeypatch.setattr(service, "_construct_request", construct_request)
+
+    session = FakeSession()
+    await service._complete_batch(session, BATCH_ID, payload, payload_version)
+    _stmt, rows = session.executed[-1]
+    original, _recognized = load_recognized(rows[0]["recognized"])
+    return original, constructed
+
+
+async def test_recognition_current_payload_constructed(monkeypatch):
+    original, constructed = await _recognize(
+        monkeypatch, RECOGNITION_PAYLOAD, address_recognition._PAYLOAD_VERSION
+    )
+
+    assert constructed == 1
+    assert original == RECOGNITION_PAYLOAD[0]["address"]
+
+
+@pytest.mark.parametrize("payload_version", [None, address_recognition._PAYLOAD_VERSION - 1])
+async def test_recognition_stale_payload_revalidated(monkeypatch, payload_version):
+    original, constructed = await _recognize(monkeypatch, RECOGNITION_PAYLOAD, payload_version)
+
+    assert constructed == 0
+    assert original == RECOGNITION_PAYLOAD[0]["address"]
+
+
+async def test_recognition_stale_payload_rejected_when_invalid(monkeypatch):
+    payload = [{"text": "", "address": None}]
+
+    with pytest.raises(ValidationError):
+        await _recognize(monkeypatch, payload, None)
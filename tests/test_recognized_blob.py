@@ -0,0 +1,53 @@
+import orjson
+
+from app.services.address_recognition import dump_recognized, load_recognized
+
+ORIGINAL = {
+    "address_line1": " 1 main st ",
+    "city_locality": "austin",
+    "country_code": "us",
+    "postal_code": 78701,
+    "address_residential_indicator": None,
+}
+RECOGNIZED = {
+    "address_line1": "1 MAIN ST",
+    "city_locality": "AUSTIN",
+    "country_code": "US",
+    "postal_code": 78701,
+    "address_residential_indicator": "unknown",
+}
+
+
+def test_v2_round_trip():
+    blob = dump_recognized(ORIGINAL, RECOGNIZED)
+
+    assert load_recognized(blob) == (ORIGINAL, RECOGNIZED)
+
+
+def test_v2_stores_only_changed_keys():
+    data = orjson.loads(dump_recognized(ORIGINAL, RECOGNIZED))
+
+    assert data["v"] == 2
+    assert data["original_address"] == ORIGINAL
+    assert data["changes"] == {k: v for k, v in RECOGNIZED.items() if k != "postal_code"}
+
+
+def test_v2_round_trip_without_changes():
+    assert load_recognized(dump_recognized(RECOGNIZED, RECOGNIZED)) == (RECOGNIZED, RECOGNIZED)
+
+
+def test_v2_round_trip_with_added_keys():
+    recognized = {**RECOGNIZED, "state_province": "TX"}
+
+    assert load_recognized(dump_recognized(ORIGINAL, recognized)) == (ORIGINAL, recognized)
+
+
+def test_v1_blob_is_read():
+    blob = orjson.dumps({"original_address": ORIGINAL, "recognized_address": RECOGNIZED})
+
+    assert load_recognized(blob) == (ORIGINAL, RECOGNIZED)
+
+
+def test_empty_blob():
+    assert load_recognized(None) == ({}, {})
+    assert load_recognized(b"") == ({}, {})
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from typing import Any
+
+import pytest
+from arq import Retry
+from arq.connections import ArqRedis
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeAsyncRedisConnection
+from redis.asyncio import ConnectionPool
+
+from app.workers import streams
+
+
+@pytest.fixture
+async def redis():
+    pool = ConnectionPool(connection_class=FakeAsyncRedisConnection, server=FakeServer())
+    redis = ArqRedis(connection_pool=pool)
+    await streams._ensure_group(redis)
+    yield redis
+    await redis.aclose()
+
+
+async def _add(redis: ArqRedis, function: str, arg: str) -> bytes:
+    return await redis.xadd(streams.STREAM_KEY, {"function": function, "arg": arg})
+
+
+async def _deliver(redis: ArqRedis, consumer: str, times: int = 1) -> None:
+    await redis.xreadgroup(streams.GROUP_NAME, consumer, {streams.STREAM_KEY: ">"})
+    for _ in range(times - 1):
+        # XCLAIM bumps the delivery count, as a reclaim by another worker would.
+        pending = await redis.xpending_range(streams.STREAM_KEY, streams.GROUP_NAME, "-", "+", 100)
+        await redis.xclaim(
+            streams.STREAM_KEY, streams.GROUP_NAME, consumer, 0, [p["message_id"] for p in pending]
+        )
+
+
+async def _is_done(redis: ArqRedis) -> bool:
+    pending = await redis.xpending(streams.STREAM_KEY, streams.GROUP_NAME)
+    return pending["pending"] == 0 and await redis.xlen(streams.STREAM_KEY) == 0
+
+
+async def _run(redis: ArqRedis, function: Any, job_timeout: float = 1.0) -> None:
+    entry_id = await _add(redis, function.__name__, "a1")
+    await _deliver(redis, "c1")
+    fields = {b"function": function.__name__.encode(), b"arg": b"a1"}
+    await streams._run_entry(
+        {"redis": redis}, {function.__name__: function}, entry_id, fields, job_timeout
+    )
+
+
+async def test_run_entry_runs_job_and_finishes_entry(redis):
+    calls = []
+
+    async def job(ctx, arg):
+        calls.append((ctx["job_try"], arg))
+
+    await _run(redis, job)
+
+    assert calls == [(1, "a1")]
+    assert await _is_done(redis)
+
+
+async def test_run_entry_hands_retry_to_arq(redis):
+    async def job(ctx, arg):
+        raise Retry(defer=5)
+
+    await _run(redis, job)
+
+    [queued] = await redis.queued_jobs()
+    assert (queued.function, queued.args, queued.job_try) == ("job", ("a1",), 2)
+    assert await _is_done(redis)
+
+
+async def test_run_entry_logs_failure_and_finishes_entry(redis, caplog):
+    async def job(ctx, arg):
+        raise ValueError("boom")
+
+    with caplog.at_level(logging.ERROR, logger=streams.__name__):
+        await _run(redis, job)
+
+    assert "job(a1) failed" in caplog.text
+    assert await _is_done(redis)
+
+
+async def test_run_entry_times_out(redis):
+    async def job(ctx, arg):
+        await asyncio.sleep(10)
+
+    await _run(redis, job, job_timeout=0.01)
+
+    assert await _is_done(redis)
+
+
+async def test_claim_takes_idle_entries(redis):
+    entry_id = await _add(redis, "job", "a1")
+    await _deliver(redis, "dead")
+
+    next_start, entries = await streams._claim(redis, "c1", "0-0", 10, 0, 0)
+
+    assert next_start in (b"0-0", "0-0")
+    assert entries == [(entry_id, {b"function": b"job", b"arg": b"a1"})]
+
+
+async def test_claim_skips_busy_entries(redis):
+    await _add(redis, "job", "a1")
+    await _deliver(redis, "live")
+
+    _next_start, entries = await streams._claim(redis, "c1", "0-0", 10, 60_000, 0)
+
+    assert entries == []
+
+
+async def test_claim_drops_entries_delivered_too_often(redis):
+    await _add(redis, "job", "a1")
+    await _deliver(redis, "dead", times=streams._MAX_DELIVERIES)
+
+    _next_start, entries = await streams._claim(redis, "c1", "0-0", 10, 0, 0)
+
+    assert entries == []
+    assert await _is_done(redis)
+
+
+async def test_claim_acks_deleted_entries(redis, monkeypatch):
+    deleted_id = await _add(redis, "job", "a1")
+    live_id = await _add(redis, "job", "a2")
+    await _deliver(redis, "dead")
+    await redis.xdel(streams.STREAM_KEY, deleted_id)
+
+    xautoclaim = redis.xautoclaim
+
+    async def xautoclaim_62(*args, **kwargs):
+        # Redis 6.2 still returns entries deleted while pending, with nil fields.
+        next_start, claimed, *_ = await xautoclaim(*args, **kwargs)
+        return [next_start, [(deleted_id, {}), *claimed]]
+
+    monkeypatch.setattr(redis, "xautoclaim", xautoclaim_62)
+
+    _next_start, entries = await streams._claim(redis, "c1", "0-0", 10, 0, 0)
+
+    assert [entry_id for entry_id, _fields in entries] == [live_id]
+    pending = await redis.xpending_range(streams.STREAM_KEY, streams.GROUP_NAME, "-", "+", 10)
+    assert [p["message_id"] for p in pending] == [live_id]